@@ -1,16 +1,206 @@
+import glob
+import hashlib
+import os
+import tempfile
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import seaborn as sns
-import matplotlib.pyplot as plt
+import numpy as np
+
+SNAPSHOT_DIR = 'data'
+# Bump whenever read_and_clean_csv changes the snapshot's columns or dtypes
+SNAPSHOT_VERSION = 'v3'
+
+# Raw CSV columns the app reads; anything else in the file is skipped at parse time
+RAW_COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Quantity', 'InvoiceDate', 'UnitPrice', 'CustomerID', 'Country']
+
+# Read the raw CSV and clean it; only runs when there is no Parquet snapshot yet
+def read_and_clean_csv(file_path):
+    # Low-cardinality text columns are read straight into categoricals so groupbys hash integer codes,
+    # Quantity/CustomerID are downcast and InvoiceDate is parsed with an explicit format to stay on the
+    # fast C parser. Prices and sales stay float64 so dollar totals remain exact to the cent.
+    data = pd.read_csv(file_path, encoding='ISO-8859-1', usecols=RAW_COLUMNS, dtype={
+        'Country': 'category',
+        'StockCode': 'category',
+        'Description': 'category',
+        'InvoiceNo': 'string',
+        'Quantity': 'int32',
+        'UnitPrice': 'float64',
+        'CustomerID': 'float32'
+    }, parse_dates=['InvoiceDate'], date_format='%m/%d/%Y %H:%M')
+    data['TotalSales'] = data['Quantity'] * data['UnitPrice']
+    data = data[data['Quantity'] > 0].copy()
+    for column in ('Country', 'StockCode', 'Description'):
+        data[column] = data[column].cat.remove_unused_categories()
+    # Day of each invoice, precomputed once so daily rollups don't build a date per row on every rerun
+    data['DateKey'] = data['InvoiceDate'].to_numpy().astype('datetime64[D]')
+    return data
 
-# Load and clean data (cached as shown previously)
+# Snapshot location for a given source, so each CSV URL/path gets its own Parquet file
+def snapshot_path(file_path, version=SNAPSHOT_VERSION):
+    digest = hashlib.sha1(file_path.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(SNAPSHOT_DIR, f"data-{version}-{digest}.parquet")
+
+# Write the cleaned CSV to a temp file and move it into place, so a crash or a concurrent
+# cold load never leaves a truncated snapshot behind
+def write_snapshot(file_path, path):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix='.parquet.tmp')
+    os.close(fd)
+    try:
+        read_and_clean_csv(file_path).to_parquet(tmp_path, compression='zstd', index=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    # Remove snapshots of the same source left behind by older versions
+    for stale_path in glob.glob(snapshot_path(file_path, version='*')):
+        if stale_path != path:
+            try:
+                os.remove(stale_path)
+            except FileNotFoundError:
+                pass  # Already removed by a concurrent cold load
+
+# Load and clean data (cached as shown previously), backed by a typed Parquet snapshot of the cleaned CSV
 @st.cache_data
 def load_and_clean_data(file_path):
-    data = pd.read_csv(file_path, encoding='ISO-8859-1')
-    data['InvoiceDate'] = pd.to_datetime(data['InvoiceDate'])
-    data['TotalSales'] = data['Quantity'] * data['UnitPrice']
-    return data[data['Quantity'] > 0]
+    path = snapshot_path(file_path)
+    if not os.path.exists(path):
+        write_snapshot(file_path, path)
+    return pd.read_parquet(path)
+
+# Positional row indices per country, built once so filtering is a gather instead of a full-column mask
+@st.cache_resource
+def country_index(_data):
+    return _data.groupby('Country', observed=True).indices
+
+# Rows for a single country; only materialized inside the cached per-tab helpers that need them
+def filter_by_country(data, country):
+    return data if country == "All" else data.take(country_index(data)[country])
+
+# Drop unused categories so small display frames don't ship the full category dictionary to the browser
+def trim_categories(df):
+    categorical = df.select_dtypes('category').columns
+    return df.assign(**{column: df[column].cat.remove_unused_categories() for column in categorical})
+
+# Columns shown in the Data Exploration sample; selecting them up front keeps the frame sent to the browser narrow
+SAMPLE_COLUMNS = ['InvoiceNo', 'InvoiceDate', 'Description', 'Quantity', 'UnitPrice', 'TotalSales', 'Country']
+
+# Data Exploration sample and summary statistics
+@st.cache_data
+def compute_exploration_summary(_data, country):
+    filtered_data = filter_by_country(_data, country)
+    return (
+        trim_categories(filtered_data[SAMPLE_COLUMNS].head(20)),
+        len(filtered_data),
+        filtered_data['StockCode'].nunique(),
+        filtered_data['CustomerID'].nunique(),
+        filtered_data['TotalSales'].sum()
+    )
+
+# Product Performance rollup, sorted by total sales so the top-N slider is just a slice
+@st.cache_data
+def product_rollup(_data, country):
+    g = filter_by_country(_data, country).groupby('Description', observed=True)
+    return pd.DataFrame({
+        'TotalSales': g['TotalSales'].sum(),
+        'Quantity': g['Quantity'].sum()
+    }).sort_values('TotalSales', ascending=False).reset_index()
+
+# Country Insights rollup across all countries, sorted by total sales
+@st.cache_data
+def country_rollup(_data):
+    g = _data.groupby('Country', observed=True)
+    return pd.DataFrame({
+        'TotalSales': g['TotalSales'].sum(),
+        'CustomerID': g['CustomerID'].nunique()
+    }).sort_values('TotalSales', ascending=False).reset_index()
+
+# Country Insights totals for a single country
+@st.cache_data
+def compute_country_totals(_data, country):
+    filtered_data = filter_by_country(_data, country)
+    return filtered_data['TotalSales'].sum(), filtered_data['CustomerID'].nunique()
+
+# Quantile score (1 = lowest bin) for each value, equivalent to pd.qcut(values, bins, duplicates="drop") codes + 1
+def rfm_score(values, bins=5, reverse=False):
+    # Dedupe the full edge set (min and max included) as qcut does, then keep only the inner edges
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)))[1:-1]
+    scores = np.searchsorted(edges, values, side='left') + 1
+    if reverse:
+        scores = len(edges) + 2 - scores
+    return scores.astype(np.int8)
+
+# RFM metrics and scores (cached per country so tab switches and unrelated widgets don't recompute)
+@st.cache_data
+def compute_rfm(_data, country):
+    filtered_data = filter_by_country(_data, country)
+
+    # Set a reference date for Recency calculations (e.g., the day after the last transaction)
+    reference_date = filtered_data['InvoiceDate'].max() + pd.Timedelta(days=1)
+
+    # Calculate RFM metrics
+    grp = filtered_data.groupby('CustomerID')
+    recency = (reference_date - grp['InvoiceDate'].max()).dt.days.rename('Recency')
+    frequency = grp['InvoiceNo'].nunique().rename('Frequency')
+    monetary = grp['TotalSales'].sum().rename('Monetary')
+    rfm = pd.concat([recency, frequency, monetary], axis=1).reset_index()
+
+    # RFM scoring on quantile breakpoints; duplicate edges collapse into fewer scores
+    rfm['R_Score'] = rfm_score(rfm['Recency'].to_numpy(), reverse=True)
+    rfm['F_Score'] = rfm_score(rfm['Frequency'].to_numpy())
+    rfm['M_Score'] = rfm_score(rfm['Monetary'].to_numpy())
+
+    # Combine scores into RFM Segment and RFM Score
+    r, f, m = (rfm[score].to_numpy(np.int16) for score in ('R_Score', 'F_Score', 'M_Score'))
+    rfm['RFM_Segment'] = r * 100 + f * 10 + m
+    rfm['RFM_Score'] = rfm[['R_Score', 'F_Score', 'M_Score']].sum(axis=1)
+
+    return rfm
+
+@st.cache_data
+def compute_segment_counts(rfm):
+    segment_counts = rfm['RFM_Segment'].value_counts()
+    # Label segments as text so bar charts treat them as categories rather than numbers
+    segment_counts.index = segment_counts.index.astype(str)
+    return segment_counts
+
+@st.cache_data
+def compute_sales_by_segment(rfm):
+    sales_by_segment = rfm.groupby('RFM_Segment').agg({
+        'Monetary': ['sum', 'mean'],
+        'CustomerID': 'count'
+    }).reset_index()
+    sales_by_segment.columns = ['RFM_Segment', 'Total Sales', 'Average Sales per Customer', 'Customer Count']
+    return sales_by_segment
+
+@st.cache_data
+def compute_heatmap_data(rfm):
+    # Most recent customers (R=5) on the top row, as in the original qcut-labelled pivot
+    return rfm.groupby(['R_Score', 'F_Score'])['Monetary'].mean().unstack('F_Score').sort_index(ascending=False)
+
+# Histogram counts labelled by bin range (in bin order), for lightweight bar-chart distributions
+@st.cache_data
+def compute_histogram(values, bins=10):
+    # Integer metrics with a narrow range get one bar per value rather than fractional bins
+    if np.issubdtype(values.dtype, np.integer) and values.max() - values.min() < bins:
+        low, high = int(values.min()), int(values.max())
+        return pd.Series(np.bincount(values - low), index=[str(value) for value in range(low, high + 1)])
+    counts, edges = np.histogram(values, bins=bins)
+    # Use the fewest decimals that still give every bin a distinct label
+    for decimals in range(7):
+        labels = [f"{edges[i]:.{decimals}f}–{edges[i + 1]:.{decimals}f}" for i in range(bins)]
+        if len(set(labels)) == bins:
+            break
+    return pd.Series(counts, index=labels)
+
+# Daily sales per country (Country x day), so date-range changes are a slice rather than a filter + groupby;
+# days a country didn't trade stay NaN so they can be dropped rather than plotted as zero sales
+@st.cache_data
+def daily_pivot(_data):
+    return _data.pivot_table(
+        index='DateKey', columns='Country', values='TotalSales', aggfunc='sum', observed=True
+    ).sort_index()
 
 data = load_and_clean_data('https://drive.google.com/uc?export=download&id=1p9UhuXH6sCp64lwz1h3MSikUxeXroM6I')
 selected_country = "All"
@@ -18,8 +208,7 @@ selected_country = "All"
 title = st.sidebar.title("E-commerce Data Analysis")
 
 # Sidebar for global country filter
-selected_country = st.sidebar.selectbox("Filter by country", options=["All"] + data['Country'].unique().tolist())
-filtered_data = data if selected_country == "All" else data[data['Country'] == selected_country]
+selected_country = st.sidebar.selectbox("Filter by country", options=["All"] + data['Country'].cat.categories.tolist())
 
 title.title(f"E-commerce Data Analysis {'for ' + selected_country if selected_country != 'All' else ''}")
 
@@ -29,14 +218,10 @@ tab = st.sidebar.radio("Navigate", ["Data Exploration", "Sales Trends", "Product
 if tab == "Data Exploration":
     st.header("Data Exploration")
     st.write("### Sample of Filtered Data")
-    st.dataframe(filtered_data.head(20))
+    sample, total_rows, unique_products, unique_customers, total_sales_value = compute_exploration_summary(data, selected_country)
+    st.dataframe(sample)
     
     # Summary statistics
-    total_rows = len(filtered_data)
-    unique_products = filtered_data['StockCode'].nunique()
-    unique_customers = filtered_data['CustomerID'].nunique()
-    total_sales_value = filtered_data['TotalSales'].sum()
-    
     st.write(f"**Total Rows:** {total_rows}")
     st.write(f"**Unique Products:** {unique_products}")
     st.write(f"**Unique Customers:** {unique_customers}")
@@ -45,36 +230,33 @@ if tab == "Data Exploration":
 # Tab 2: Sales Trends
 elif tab == "Sales Trends":
     st.header("Sales Trends Over Time")
+    pv = daily_pivot(data)
+    country_daily_sales = pv.sum(axis=1) if selected_country == "All" else pv[selected_country].dropna()
+    active_days = country_daily_sales.index
     start_date, end_date = st.slider(
         'Select Date Range',
-        min_value=filtered_data['InvoiceDate'].min().date(),
-        max_value=filtered_data['InvoiceDate'].max().date(),
-        value=(st.session_state.get('start_date', filtered_data['InvoiceDate'].min().date()), 
-               st.session_state.get('end_date', filtered_data['InvoiceDate'].max().date()))
+        min_value=active_days.min().date(),
+        max_value=active_days.max().date(),
+        value=(st.session_state.get('start_date', active_days.min().date()), 
+               st.session_state.get('end_date', active_days.max().date()))
         # value=(data['InvoiceDate'].min().date(), data['InvoiceDate'].max().date())
     )
     
     st.session_state['start_date'], st.session_state['end_date'] = start_date, end_date
 
-    filtered_time_data = filtered_data[(filtered_data['InvoiceDate'] >= pd.Timestamp(start_date)) & 
-                                       (filtered_data['InvoiceDate'] <= pd.Timestamp(end_date))]
-
-    daily_sales = filtered_time_data.groupby(filtered_time_data['InvoiceDate'].dt.date)['TotalSales'].sum()
+    daily_sales = country_daily_sales.loc[pd.Timestamp(start_date):pd.Timestamp(end_date)]
     st.line_chart(daily_sales)
     st.write(f"### Total Sales from {start_date} to {end_date}: ${daily_sales.sum():,.2f}")
 
 # Tab 3: Product Performance
 elif tab == "Product Performance":
     st.header("Product Performance")
-    product_performance = filtered_data.groupby('Description').agg({
-        'TotalSales': 'sum',
-        'Quantity': 'sum'
-    }).reset_index()
+    product_performance = product_rollup(data, selected_country)
 
     num_products = st.slider("Select number of top products to display", min_value=5, max_value=20, value=st.session_state.get('num_products', 10))
     st.session_state['num_products'] = num_products
 
-    top_products = product_performance.sort_values(by='TotalSales', ascending=False).head(num_products)
+    top_products = trim_categories(product_performance.iloc[:num_products])
 
     st.write(f"### Top {num_products} Products by Total Sales")
     st.bar_chart(top_products[['Description', 'TotalSales']].set_index('Description'))
@@ -84,11 +266,10 @@ elif tab == "Product Performance":
 # Tab 4: Country Insights
 elif tab == "Country Insights":
     st.header("Country-Based Sales Insights")
+    # Imported here so sessions that never open a Plotly tab skip its import cost
+    import plotly.express as px
     if selected_country == "All":
-        country_sales = filtered_data.groupby('Country').agg({
-            'TotalSales': 'sum',
-            'CustomerID': 'nunique'
-        }).reset_index()
+        country_sales = country_rollup(data)
 
         fig = px.choropleth(
             country_sales,
@@ -102,66 +283,32 @@ elif tab == "Country Insights":
         )
         st.plotly_chart(fig)
         st.write("### Top 10 Countries by Total Sales")
-        st.dataframe(country_sales.sort_values(by='TotalSales', ascending=False).head(10))
+        st.dataframe(trim_categories(country_sales.head(10)))
     else:
         st.write(f"### Sales and Customer Insights for {selected_country}")
-        st.write(f"**Total Sales:** ${filtered_data['TotalSales'].sum():,.2f}")
-        st.write(f"**Unique Customers:** {filtered_data['CustomerID'].nunique()}")
+        country_total_sales, country_unique_customers = compute_country_totals(data, selected_country)
+        st.write(f"**Total Sales:** ${country_total_sales:,.2f}")
+        st.write(f"**Unique Customers:** {country_unique_customers}")
 
 # RFM Analysis Tab
 elif tab == "RFM Analysis":
     st.header("RFM Analysis")
+    import plotly.express as px
     
-    # Set a reference date for Recency calculations (e.g., the day after the last transaction)
-    reference_date = filtered_data['InvoiceDate'].max() + pd.Timedelta(days=1)
-    
-    # Calculate RFM metrics
-    rfm = filtered_data.groupby('CustomerID').agg({
-        'InvoiceDate': lambda x: (reference_date - x.max()).days,
-        'InvoiceNo': 'nunique',
-        'TotalSales': 'sum'
-    }).reset_index()
-    rfm.columns = ['CustomerID', 'Recency', 'Frequency', 'Monetary']
-    
-    # RFM scoring with error-handling for duplicate bin edges
-    rfm['R_Score'] = pd.qcut(rfm['Recency'], 5, labels=[5, 4, 3, 2, 1])
-
-    # Dynamic Frequency Score
-    for bins in range(5, 1, -1):  # Start with 5 bins, reduce if duplicates are an issue
-        try:
-            rfm['F_Score'] = pd.qcut(rfm['Frequency'], bins, labels=range(1, bins + 1), duplicates="drop")
-            break  # Exit loop if binning succeeds
-        except ValueError:
-            continue  # Try with one less bin if duplicates error occurs
-
-    # Dynamic Monetary Score
-    for bins in range(5, 1, -1):  # Start with 5 bins, reduce if duplicates are an issue
-        try:
-            rfm['M_Score'] = pd.qcut(rfm['Monetary'], bins, labels=range(1, bins + 1), duplicates="drop")
-            break  # Exit loop if binning succeeds
-        except ValueError:
-            continue  # Try with one less bin if duplicates error occurs
+    rfm = compute_rfm(data, selected_country)
 
-    # Combine scores into RFM Segment and RFM Score
-    rfm['RFM_Segment'] = rfm['R_Score'].astype(str) + rfm['F_Score'].astype(str) + rfm['M_Score'].astype(str)
-    rfm['RFM_Score'] = rfm[['R_Score', 'F_Score', 'M_Score']].sum(axis=1)
-    
     # Display RFM table
     st.write("### RFM Table")
     st.dataframe(rfm[['CustomerID', 'Recency', 'Frequency', 'Monetary', 'RFM_Segment', 'RFM_Score']])
 
     # Feature 1: Customer Count by Segment
     st.write("### Customer Count by RFM Segment")
-    segment_counts = rfm['RFM_Segment'].value_counts()
+    segment_counts = compute_segment_counts(rfm)
     st.bar_chart(segment_counts)
 
     # Feature 2: Sales by Segment
     st.write("### Sales Summary by RFM Segment")
-    sales_by_segment = rfm.groupby('RFM_Segment').agg({
-        'Monetary': ['sum', 'mean'],
-        'CustomerID': 'count'
-    }).reset_index()
-    sales_by_segment.columns = ['RFM_Segment', 'Total Sales', 'Average Sales per Customer', 'Customer Count']
+    sales_by_segment = compute_sales_by_segment(rfm)
     st.dataframe(sales_by_segment)
 
     # Feature 3: Top RFM Segments by Customer Count
@@ -171,30 +318,41 @@ elif tab == "RFM Analysis":
 
     # Additional Feature 4: RFM Score Distribution Histograms
     st.write("### RFM Metric Distributions")
-    fig, axes = plt.subplots(1, 3, figsize=(15, 5))
-    sns.histplot(rfm['Recency'], bins=10, kde=True, ax=axes[0], color='skyblue')
-    axes[0].set_title("Recency Distribution")
-    sns.histplot(rfm['Frequency'], bins=10, kde=True, ax=axes[1], color='lightgreen')
-    axes[1].set_title("Frequency Distribution")
-    sns.histplot(rfm['Monetary'], bins=10, kde=True, ax=axes[2], color='salmon')
-    axes[2].set_title("Monetary Distribution")
-    st.pyplot(fig)
+    for column, (metric, color) in zip(st.columns(3), [('Recency', '#87CEEB'), ('Frequency', '#90EE90'), ('Monetary', '#FA8072')]):
+        column.write(f"**{metric} Distribution**")
+        histogram = compute_histogram(rfm[metric].to_numpy())
+        fig = px.bar(
+            x=histogram.index,
+            y=histogram.to_numpy(),
+            color_discrete_sequence=[color],
+            labels={"x": metric, "y": "Customers"}
+        )
+        # Keep bins in numeric order instead of sorting the range labels as text
+        fig.update_xaxes(type="category", categoryorder="array", categoryarray=histogram.index.tolist())
+        column.plotly_chart(fig)
 
     # Additional Feature 5: RFM Heatmap (Recency vs Frequency, Average Monetary Value)
     st.write("### RFM Heatmap (Average Monetary Value by Recency and Frequency Scores)")
-    heatmap_data = rfm.pivot_table(index='R_Score', columns='F_Score', values='Monetary', aggfunc='mean')
-    fig, ax = plt.subplots(figsize=(8, 6))
-    sns.heatmap(heatmap_data, annot=True, fmt=".2f", cmap="YlGnBu", ax=ax)
-    ax.set_xlabel("Frequency Score")
-    ax.set_ylabel("Recency Score")
-    st.pyplot(fig)
+    heatmap_data = compute_heatmap_data(rfm)
+    fig = px.imshow(
+        heatmap_data,
+        text_auto=".2f",
+        color_continuous_scale="YlGnBu",
+        labels={"x": "Frequency Score", "y": "Recency Score", "color": "Avg Monetary"}
+    )
+    st.plotly_chart(fig)
 
     # Additional Feature 6: Scatter Plot of Recency vs. Frequency by Segment
     st.write("### Recency vs. Frequency by Segment")
-    fig, ax = plt.subplots(figsize=(10, 6))
-    scatter = ax.scatter(rfm['Recency'], rfm['Frequency'], c=rfm['RFM_Score'], cmap='viridis', alpha=0.6)
-    plt.colorbar(scatter, ax=ax, label="RFM Score")
-    ax.set_xlabel("Recency")
-    ax.set_ylabel("Frequency")
-    ax.set_title("Scatter Plot of Recency vs. Frequency by RFM Score")
-    st.pyplot(fig)
+    fig = px.scatter(
+        rfm,
+        x="Recency",
+        y="Frequency",
+        color="RFM_Score",
+        render_mode="webgl",
+        color_continuous_scale="viridis",
+        opacity=0.6,
+        labels={"RFM_Score": "RFM Score"},
+        title="Scatter Plot of Recency vs. Frequency by RFM Score"
+    )
+    st.plotly_chart(fig)